@@ -1,9 +1,13 @@
 import streamlit as st
+import hashlib
 import tempfile
 import os
 import shutil
 import time
-from rag_system import RAGSystem
+import numpy as np
+from metrics import l2_to_cos
+from config import Config
+from rag_system import LOADER_VERSION, RAGSystem
 
 # Page Config
 st.set_page_config(page_title="Tellow RAG", layout="wide")
@@ -12,12 +16,37 @@ st.set_page_config(page_title="Tellow RAG", layout="wide")
 def get_rag_system():
     return RAGSystem()
 
+@st.cache_data(persist="disk", max_entries=64, show_spinner=False)
+def load_and_split(_rag, _source, content_hash, chunk_size, chunk_overlap, loader_version):
+    """
+    Runs Docling + splitting once per distinct content and chunking setup.
+    Keyed on `content_hash` plus the chunking parameters and loader version,
+    not the path: uploads land in a new temp path each time, and the RAG
+    system itself is not hashable (leading underscores).
+    """
+    return _rag.load_documents(_source)
+
+def compute_content_hash(source):
+    """Hashes a local file's bytes; URLs are keyed by the URL itself."""
+    if not os.path.isfile(source):
+        return source
+    digest = hashlib.blake2b()
+    with open(source, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
 def save_uploaded_file(uploaded_file):
     """Saves uploaded file to a temporary file and returns the path."""
     try:
         suffix = os.path.splitext(uploaded_file.name)[1]
         with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp_file:
-            shutil.copyfileobj(uploaded_file, tmp_file)
+            if hasattr(uploaded_file, "getbuffer"):
+                # UploadedFile is already in memory: write it in one go
+                tmp_file.write(uploaded_file.getbuffer())
+            else:
+                shutil.copyfileobj(uploaded_file, tmp_file, length=1024 * 1024)
+            uploaded_file.seek(0)
             return tmp_file.name
     except Exception as e:
         st.error(f"Error saving file: {e}")
@@ -27,6 +56,9 @@ def main():
     st.title("🤖 Tellow RAG")
     
     rag = get_rag_system()
+    # An index persisted by a previous run is ready to chat with
+    if rag.vector_store is not None:
+        st.session_state.setdefault("rag_ready", True)
     
     # Sidebar: Configuration & Data Loading
     with st.sidebar:
@@ -56,11 +88,18 @@ def main():
             
             if source:
                 try:
-                    with st.spinner(f"Loading and indexing {source}..."):
-                        documents = rag.load_documents(source)
-                        rag.setup_vector_store(documents)
-                        st.success("Document indexed successfully! You can now chat.")
-                        st.session_state["rag_ready"] = True
+                    content_hash = compute_content_hash(source)
+                    if rag.is_indexed(content_hash):
+                        st.success("Document already indexed. You can now chat.")
+                    else:
+                        with st.spinner(f"Loading and indexing {source}..."):
+                            documents = load_and_split(
+                                rag, source, content_hash,
+                                Config.CHUNK_SIZE, Config.CHUNK_OVERLAP, LOADER_VERSION
+                            )
+                            rag.setup_vector_store(documents, source, content_hash)
+                            st.success("Document indexed successfully! You can now chat.")
+                    st.session_state["rag_ready"] = True
                 except Exception as e:
                     st.error(f"An error occurred: {e}")
             else:
@@ -90,22 +129,23 @@ def main():
                         
                     st.write("**📄 Retrieved Documents (Ranked):**")
                     
-                    sources = metrics.get("sources", [])
+                    docs = metrics.get("docs", [])
+                    basenames = metrics.get("source_basenames", [])
                     scores = metrics.get("scores", [])
                     
                     if not scores:
-                        scores = [0.0] * len(sources)
+                        scores = [0.0] * len(docs)
+                    sims = l2_to_cos(np.asarray(scores, dtype=np.float32))
                         
-                    for i, (source, score, doc_content) in enumerate(zip(sources, scores, metrics.get("contexts", [""] * len(sources)))):
+                    for i, (doc, basename, score, sim_score) in enumerate(zip(docs, basenames, scores, sims)):
                         if i >= 1: break # Only show top 1
-                        sim_score = max(0, 1 - (score**2 / 2))
                         st.markdown(f"""
-                        **Top Result:** 📂 **Source:** `{os.path.basename(source)}`  
+                        **Top Result:** 📂 **Source:** `{basename}`  
                         - 📏 Distance (L2): `{score:.4f}`
                         - 🎯 Similarity: `{sim_score:.1%}`
                         """)
                         with st.expander("📜 View Content Snippet", expanded=False):
-                            st.markdown(doc_content)
+                            st.markdown(doc.page_content)
 
     # React to user input
     if prompt := st.chat_input("What is this document about?"):
@@ -125,20 +165,20 @@ def main():
                 try:
                     start_time = time.time()
                     
-                    # RAG Query
-                    result = rag.query(prompt)
+                    # RAG Query (retrieval now, answer tokens streamed below)
+                    result = rag.stream_query(prompt)
                     
-                    # Extract answer and metadata
-                    answer = result.get("answer", "")
+                    # Extract metadata
                     context_docs = result.get("context", [])
                     scores = result.get("scores", [])
                     top_k = result.get("top_k", 0)
                     
+                    # Render tokens as they arrive; returns the full answer
+                    answer = st.write_stream(result["answer"])
+                    
                     end_time = time.time()
                     elapsed_time = end_time - start_time
                     
-                    st.markdown(answer)
-                    
                     # Display Metrics
                     with st.expander("📊 Response Metrics", expanded=False):
                         col1, col2 = st.columns(2)
@@ -152,13 +192,12 @@ def main():
                         # Zip docs and scores. If scores missing (mocking?), handle gracefully
                         if not scores:
                             scores = [0.0] * len(context_docs)
+                        # Calculate similarity % (Approximation for L2 on normalized vectors)
+                        sims = l2_to_cos(np.asarray(scores, dtype=np.float32))
                             
-                        for i, (doc, score) in enumerate(zip(context_docs, scores)):
+                        for i, (doc, score, sim_score) in enumerate(zip(context_docs, scores, sims)):
                             if i >= 1: break # Only show top 1
                             source = doc.metadata.get("source", "Unknown")
-                            # Calculate similarity % (Approximation for L2 on normalized vectors)
-                            # Cosine Sim = 1 - (L2^2 / 2)
-                            sim_score = max(0, 1 - (score**2 / 2))
                             
                             st.markdown(f"""
                             **Top Result:** 📂 **Source:** `{os.path.basename(source)}`  
@@ -174,10 +213,16 @@ def main():
                         "content": answer,
                         "metrics": {
                             "time": elapsed_time,
-                            "sources": [doc.metadata.get("source", "Unknown") for doc in context_docs],
+                            # Keep references to the retrieved Documents;
+                            # fields are read at render time
+                            "docs": context_docs,
+                            # Resolved once here rather than on every rerun
+                            "source_basenames": [
+                                os.path.basename(doc.metadata.get("source", "Unknown"))
+                                for doc in context_docs
+                            ],
                             "scores": scores,
-                            "top_k": top_k,
-                            "contexts": [doc.page_content for doc in context_docs]
+                            "top_k": top_k
                         }
                     })
                     
@@ -17,10 +17,10 @@ class Config:
     # ==========================================================================
     # 2. DOCUMENT PROCESSING (Chunking)
     # ==========================================================================
-    # Size of each text chunk (in characters)
-    CHUNK_SIZE = 1000
-    # Overlap between consecutive chunks to maintain context
-    CHUNK_OVERLAP = 200
+    # Size of each text chunk (in LLM tokens, ~4 characters each)
+    CHUNK_SIZE = 250
+    # Overlap between consecutive chunks to maintain context (in tokens)
+    CHUNK_OVERLAP = 50
 
     # ==========================================================================
     # 3. AI MODELS
@@ -29,15 +29,37 @@ class Config:
     EMBEDDING_MODEL = "text-embedding-3-small"
     # Model used for generating the final answer
     LLM_MODEL = "gpt-4o"
+    # Texts sent per embedding request, and how many requests run in parallel
+    EMBEDDING_BATCH_SIZE = 256
+    EMBEDDING_WORKERS = 8
+    # On-disk cache of chunk embeddings, reused across re-indexing runs
+    EMBEDDING_CACHE_DIR = "data/emb_cache"
     
     # ==========================================================================
     # 4. VECTOR DATABASE
     # ==========================================================================
+    # Retrieval backend: "faiss" (HNSW / IVF-PQ index) or "lancedb" (flat scan)
+    VECTOR_BACKEND = "faiss"
     LANCEDB_URI = "data/lancedb"
     TABLE_NAME = "docling_docs"
+    # Above this many rows, LanceDB tables get an IVF_PQ ANN index
+    LANCEDB_ANN_MIN_ROWS = 10_000
+    FAISS_INDEX_DIR = "data/faiss"
+    # Source and content hash of the last indexed document, to skip rebuilds
+    INDEX_META_PATH = "data/index_meta.json"
+    # Above this many chunks, FAISS switches from HNSW to a trained IVF-PQ index
+    FAISS_IVFPQ_THRESHOLD = 100_000
+    # FAISS index_factory strings: int8 scalar quantization for small corpora,
+    # rotated product quantization (32 bytes/vector) for large ones
+    FAISS_SMALL_INDEX = "HNSW32,SQ8"
+    FAISS_LARGE_INDEX = "OPQ32,IVF1024,PQ32"
+    # Maximum number of vectors used to train the quantizers
+    FAISS_TRAIN_SAMPLE = 100_000
     
     # ==========================================================================
     # 5. RETRIEVAL PARAMETERS
     # ==========================================================================
     # Number of documents/chunks to retrieve per query
     SEARCH_K = 4
+    # Maximum tokens of retrieved context packed into the LLM prompt
+    CONTEXT_TOKEN_BUDGET = 6000
@@ -13,8 +13,7 @@ def main():
         source = default_url
 
     try:
-        documents = rag.load_documents(source)
-        rag.setup_vector_store(documents)
+        rag.ingest(source)
         
         print("\nSystem ready! Ask a question (type 'exit' to quit).")
         while True:
@@ -0,0 +1,15 @@
+import numpy as np
+from numba import njit
+
+# ==============================================================================
+# RETRIEVAL METRICS
+# ==============================================================================
+@njit(cache=True, fastmath=True)
+def l2_to_cos(distances):
+    """
+    Converts L2 distances between normalized vectors to cosine similarity.
+    Cosine Sim = 1 - (L2^2 / 2), clamped to [0, 1] because quantized
+    indexes return approximate distances.
+    cache=True keeps the compiled kernel on disk across Streamlit reruns.
+    """
+    return np.minimum(1.0, np.maximum(0.0, 1.0 - distances * distances / 2.0))
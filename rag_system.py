@@ -1,17 +1,71 @@
-from typing import List, Optional, Iterator
+import asyncio
+import json
+import math
+import multiprocessing
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Iterable, List, Optional, Iterator, Tuple, Union
+import httpx
+import numpy as np
+import faiss
+import tiktoken
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import BaseMessage
+from langchain_core.vectorstores import VectorStore
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_openai import OpenAIEmbeddings, ChatOpenAI
 from langchain_community.vectorstores import LanceDB
 from langchain.chains import create_retrieval_chain
+from langchain.embeddings import CacheBackedEmbeddings
+from langchain.storage import LocalFileStore
 from langchain.chains.combine_documents import create_stuff_documents_chain
 from langchain_core.prompts import ChatPromptTemplate
 # from langchain_core.document_loaders import BaseLoader
 import lancedb
 from docling.document_converter import DocumentConverter
+from docling_core.types.doc import (
+    DocItemLabel, ListItem, SectionHeaderItem, TableItem, TextItem
+)
 
 from config import Config
 
+# Config values resolved once at import, keeping class lookups off hot paths
+CHUNK_SIZE = Config.CHUNK_SIZE
+CHUNK_OVERLAP = Config.CHUNK_OVERLAP
+EMBEDDING_MODEL = Config.EMBEDDING_MODEL
+LLM_MODEL = Config.LLM_MODEL
+EMBEDDING_BATCH_SIZE = Config.EMBEDDING_BATCH_SIZE
+EMBEDDING_WORKERS = Config.EMBEDDING_WORKERS
+EMBEDDING_CACHE_DIR = Config.EMBEDDING_CACHE_DIR
+VECTOR_BACKEND = Config.VECTOR_BACKEND
+LANCEDB_URI = Config.LANCEDB_URI
+TABLE_NAME = Config.TABLE_NAME
+LANCEDB_ANN_MIN_ROWS = Config.LANCEDB_ANN_MIN_ROWS
+FAISS_INDEX_DIR = Config.FAISS_INDEX_DIR
+INDEX_META_PATH = Config.INDEX_META_PATH
+FAISS_IVFPQ_THRESHOLD = Config.FAISS_IVFPQ_THRESHOLD
+FAISS_SMALL_INDEX = Config.FAISS_SMALL_INDEX
+FAISS_LARGE_INDEX = Config.FAISS_LARGE_INDEX
+FAISS_TRAIN_SAMPLE = Config.FAISS_TRAIN_SAMPLE
+SEARCH_K = Config.SEARCH_K
+CONTEXT_TOKEN_BUDGET = Config.CONTEXT_TOKEN_BUDGET
+
+# Bump whenever loader/splitter output changes shape (e.g. new metadata
+# keys), so chunk caches built by older code are not reused
+LOADER_VERSION = 3
+
+PROMPT_TEMPLATE = """Answer the following question based only on the provided context:
+
+<context>
+{context}
+</context>
+
+Question: {input}
+"""
+
 # ==============================================================================
 # SECTION 1: CUSTOM DOCUMENT LOADER
 # ==============================================================================
@@ -27,105 +81,482 @@ class SimpleDoclingLoader:
     def lazy_load(self) -> Iterator[Document]:
         print(f"Converting {self.file_path} with Docling...")
         result = self._converter.convert(self.file_path)
-        # Use export_to_markdown() as it provides good structure for LLMs
-        md_content = result.document.export_to_markdown()
-        yield Document(
-            page_content=md_content,
-            metadata={"source": self.file_path}
-        )
+        document = result.document
+        if not document.pages:
+            # Non-paginated formats (Docx, Markdown, Audio): one Document.
+            # Use export_to_markdown() as it provides good structure for LLMs
+            md_content = document.export_to_markdown()
+            yield Document(
+                page_content=md_content,
+                metadata={"source": self.file_path}
+            )
+            return
+
+        # Paginated formats (PDF, images): a single pass over the item tree,
+        # grouped by page, instead of one full export per page
+        pages = {}
+        page_no = min(document.pages)
+        for item, _level in document.iterate_items():
+            if getattr(item, "prov", None):
+                page_no = item.prov[0].page_no
+            block = self._item_to_markdown(item, document)
+            if block:
+                pages.setdefault(page_no, []).append(block)
+
+        for page_no in sorted(pages):
+            yield Document(
+                page_content="\n\n".join(pages[page_no]),
+                metadata={"source": self.file_path, "page": page_no}
+            )
+
+    @staticmethod
+    def _item_to_markdown(item, document) -> str:
+        """Renders one Docling item roughly as export_to_markdown() would."""
+        if isinstance(item, TableItem):
+            return item.export_to_markdown(doc=document)
+        if not isinstance(item, TextItem) or not item.text.strip():
+            # Pictures and empty items carry no text worth retrieving
+            return ""
+        if item.label == DocItemLabel.TITLE:
+            return f"# {item.text}"
+        if isinstance(item, SectionHeaderItem):
+            return f"{'#' * (item.level + 1)} {item.text}"
+        if isinstance(item, ListItem):
+            return f"- {item.text}"
+        return item.text
 
     def load(self) -> List[Document]:
         return list(self.lazy_load())
 
+def _convert_one(source: str) -> List[Document]:
+    """
+    Process-pool worker: converts one source with its own DocumentConverter,
+    since the converter (and its CUDA state) can't be shared across processes.
+    """
+    return SimpleDoclingLoader(file_path=source).load()
+
+# ==============================================================================
+# SECTION 2: FAISS VECTOR STORE
+# ==============================================================================
+class FAISSStore(VectorStore):
+    """
+    Minimal FAISS-backed vector store.
+    Vectors are L2-normalized and kept in a quantized ANN index (HNSW over
+    int8 codes, or OPQ/IVF-PQ for large corpora); the matching Documents live in a parallel Python list so
+    FAISS ids map straight back to chunks.
+    """
+    INDEX_FILE = "index.faiss"
+    DOCS_FILE = "docs.json"
+
+    def __init__(self, embedding: Embeddings, index: Any, documents: List[Document]):
+        self._embedding = embedding
+        self._index = index
+        self._documents = documents
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    @staticmethod
+    def _to_matrix(vectors: List[List[float]]) -> np.ndarray:
+        matrix = np.ascontiguousarray(vectors, dtype=np.float32)
+        faiss.normalize_L2(matrix)
+        return matrix
+
+    @staticmethod
+    def _build_index(matrix: np.ndarray) -> Any:
+        # Vectors are stored quantized (int8 scalar codes or PQ codes), so
+        # distances returned by search are approximate (asymmetric: the
+        # query stays FP32, the stored vectors are decoded codes).
+        dim = matrix.shape[1]
+        large = len(matrix) > FAISS_IVFPQ_THRESHOLD
+        factory = FAISS_LARGE_INDEX if large else FAISS_SMALL_INDEX
+        index = faiss.index_factory(dim, factory, faiss.METRIC_L2)
+
+        # Train on a random sample; quantizer statistics converge well before
+        # the full corpus is seen.
+        sample = matrix
+        if len(matrix) > FAISS_TRAIN_SAMPLE:
+            rng = np.random.default_rng(0)
+            sample = matrix[rng.choice(len(matrix), FAISS_TRAIN_SAMPLE, replace=False)]
+        index.train(sample)
+        if large:
+            faiss.ParameterSpace().set_index_parameter(index, "nprobe", 16)
+        index.add(matrix)
+        return index
+
+    @classmethod
+    def from_embeddings(
+        cls,
+        documents: List[Document],
+        vectors: List[List[float]],
+        embedding: Embeddings
+    ) -> "FAISSStore":
+        """Builds the index from pre-computed document vectors."""
+        index = cls._build_index(cls._to_matrix(vectors))
+        return cls(embedding, index, list(documents))
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        **kwargs: Any
+    ) -> "FAISSStore":
+        metadatas = metadatas or [{} for _ in texts]
+        documents = [
+            Document(page_content=text, metadata=metadata)
+            for text, metadata in zip(texts, metadatas)
+        ]
+        return cls.from_embeddings(documents, embedding.embed_documents(texts), embedding)
+
+    def save(self, directory: str):
+        """Persists the index and its documents to `directory`."""
+        os.makedirs(directory, exist_ok=True)
+        faiss.write_index(self._index, os.path.join(directory, self.INDEX_FILE))
+        with open(os.path.join(directory, self.DOCS_FILE), "w", encoding="utf-8") as f:
+            json.dump(
+                [{"page_content": d.page_content, "metadata": d.metadata} for d in self._documents],
+                f
+            )
+
+    @classmethod
+    def load(cls, directory: str, embedding: Embeddings) -> "FAISSStore":
+        """Loads an index previously written by `save`."""
+        index = faiss.read_index(os.path.join(directory, cls.INDEX_FILE))
+        with open(os.path.join(directory, cls.DOCS_FILE), encoding="utf-8") as f:
+            documents = [Document(**d) for d in json.load(f)]
+        return cls(embedding, index, documents)
+
+    def similarity_search_with_score_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        """
+        Returns (Document, L2 distance) pairs, lower is better.
+        FAISS reports squared distances; the root is returned so scores
+        keep the same meaning as the LanceDB backend.
+        """
+        distances, ids = self._index.search(self._to_matrix([embedding]), k)
+        return [
+            (self._documents[i], float(np.sqrt(max(dist, 0.0))))
+            for dist, i in zip(distances[0], ids[0])
+            if i != -1
+        ]
+
+    def similarity_search_with_score(
+        self,
+        query: str,
+        k: int = 4,
+        **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(
+            self._embedding.embed_query(query), k=k
+        )
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k)]
+
 # ==============================================================================
-# SECTION 2: RAG SYSTEM CORE
+# SECTION 3: RAG SYSTEM CORE
 # ==============================================================================
 class RAGSystem:
     def __init__(self):
         """
         Initialize the RAG System components:
-        - Embeddings: OpenAI
+        - Embeddings: OpenAI, cached on disk per chunk text
         - LLM: ChatOpenAI
-        - Database Connection: LanceDB
+        - HTTP: a shared, pooled httpx client for both
+        - Database Connection: LanceDB (when VECTOR_BACKEND is "lancedb")
         """
-        self.embeddings = OpenAIEmbeddings(model=Config.EMBEDDING_MODEL)
-        self.llm = ChatOpenAI(model=Config.LLM_MODEL)
+        # One pooled HTTP/2 client shared by embeddings and LLM, so sync
+        # requests reuse open TCP/TLS connections instead of reconnecting.
+        # Async calls keep LangChain's default client: a pooled AsyncClient
+        # is bound to one event loop and can't be shared by this long-lived
+        # object across callers' loops.
+        self._http = httpx.Client(
+            http2=True,
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=16)
+        )
+        self.embeddings = CacheBackedEmbeddings.from_bytes_store(
+            OpenAIEmbeddings(
+                model=EMBEDDING_MODEL,
+                http_client=self._http
+            ),
+            LocalFileStore(EMBEDDING_CACHE_DIR),
+            namespace=EMBEDDING_MODEL
+        )
+        # Repeated questions skip the embedding round-trip entirely
+        self._embed_query = lru_cache(maxsize=512)(self.embeddings.embed_query)
+        self.llm = ChatOpenAI(
+            model=LLM_MODEL,
+            http_client=self._http
+        )
+        # Prompt is built once; get_rag_chain() keeps the stock stuff-chain,
+        # query paths pack context themselves within a token budget
+        self._prompt = ChatPromptTemplate.from_template(PROMPT_TEMPLATE)
+        self._document_chain = create_stuff_documents_chain(self.llm, self._prompt)
+        self._encoding = tiktoken.encoding_for_model(LLM_MODEL)
+        # Chunks are bounded in LLM tokens rather than characters
+        self._text_splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
+            model_name=LLM_MODEL,
+            chunk_size=CHUNK_SIZE,
+            chunk_overlap=CHUNK_OVERLAP
+        )
         self.vector_store = None
-        self._db = lancedb.connect(Config.LANCEDB_URI)
+        self._db = lancedb.connect(LANCEDB_URI)
+        # Reuse an index persisted by a previous run, if any
+        self.index_meta = self._read_index_meta()
+        self._load_existing_store()
+
+    def __del__(self):
+        http = getattr(self, "_http", None)
+        if http is not None:
+            http.close()
 
     # --------------------------------------------------------------------------
     # Phase A: Document Loading & Splitting
     # --------------------------------------------------------------------------
-    def load_documents(self, source: str) -> List[Document]:
-        """Loads documents using Docling from a URL or file path."""
-        print(f"Loading documents from: {source}...")
-        # Use our custom loader
-        loader = SimpleDoclingLoader(file_path=source)
-        docs = loader.load()
-        
-        # Split documents for better retrieval
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=Config.CHUNK_SIZE,
-            chunk_overlap=Config.CHUNK_OVERLAP
-        )
-        splits = text_splitter.split_documents(docs)
+    def _iter_loaded(self, sources: List[str]) -> Iterator[Document]:
+        """Yields Docling documents, converting several sources in parallel."""
+        if not sources:
+            return
+        if len(sources) == 1:
+            # Use our custom loader, lazily, in this process
+            yield from SimpleDoclingLoader(file_path=sources[0]).lazy_load()
+            return
+
+        # Docling is CPU-bound (OCR/layout/ASR): one process per file.
+        # "spawn", not fork: the parent may be a multithreaded Streamlit
+        # server with torch/CUDA already initialized by an earlier load
+        max_workers = min(len(sources), os.cpu_count() or 1)
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            for docs in executor.map(_convert_one, sources):
+                yield from docs
+
+    def iter_documents(self, source: Union[str, List[str]]) -> Iterator[Document]:
+        """Lazily loads URLs or file paths with Docling and yields their chunks."""
+        sources = [source] if isinstance(source, str) else list(source)
+        print(f"Loading documents from: {', '.join(sources)}...")
+
+        # Split documents for better retrieval, one page at a time
+        for doc in self._iter_loaded(sources):
+            yield from self._text_splitter.split_documents([doc])
+
+    def load_documents(self, source: Union[str, List[str]]) -> List[Document]:
+        """Loads documents using Docling from one or more URLs or file paths."""
+        splits = list(self.iter_documents(source))
         print(f"Loaded and split into {len(splits)} chunks.")
         return splits
 
+    def ingest(self, source: Union[str, List[str]], content_hash: Optional[str] = None):
+        """Loads and indexes `source`, embedding chunks while loading continues."""
+        self.setup_vector_store(self.iter_documents(source), source, content_hash)
+
     # --------------------------------------------------------------------------
     # Phase B: Vector Store Indexing
     # --------------------------------------------------------------------------
-    def setup_vector_store(self, documents: List[Document]):
-        """Initializes or updates the LanceDB vector store."""
-        print("Indexing documents into LanceDB...")
-        # Create table if it doesn't exist, or open it
-        self.vector_store = LanceDB.from_documents(
-            documents,
-            self.embeddings,
-            connection=self._db,
-            table_name=Config.TABLE_NAME
-        )
+    def _embed_documents(
+        self,
+        documents: Iterable[Document]
+    ) -> Tuple[List[Document], List[List[float]]]:
+        """
+        Embeds documents in API-sized batches sent concurrently.
+        Each batch is submitted as soon as it fills, so a lazy source keeps
+        producing chunks while earlier batches are being embedded.
+        """
+        batch_size = EMBEDDING_BATCH_SIZE
+        docs, window, futures = [], [], []
+        with ThreadPoolExecutor(max_workers=EMBEDDING_WORKERS) as executor:
+            for doc in documents:
+                docs.append(doc)
+                window.append(doc.page_content)
+                if len(window) == batch_size:
+                    futures.append(executor.submit(self.embeddings.embed_documents, window))
+                    window = []
+            if window:
+                futures.append(executor.submit(self.embeddings.embed_documents, window))
+            vectors = [vector for future in futures for vector in future.result()]
+        return docs, vectors
+
+    def setup_vector_store(
+        self,
+        documents: Iterable[Document],
+        source: Union[str, List[str], None] = None,
+        content_hash: Optional[str] = None
+    ):
+        """
+        Initializes or updates the configured vector store.
+        `source` / `content_hash` are recorded so is_indexed() can tell
+        whether a later load of the same content needs re-indexing.
+        """
+        documents, vectors = self._embed_documents(documents)
+        if not documents:
+            raise ValueError("No content extracted from source")
+        texts = [doc.page_content for doc in documents]
+
+        if VECTOR_BACKEND == "faiss":
+            print("Indexing documents into FAISS...")
+            self.vector_store = FAISSStore.from_embeddings(documents, vectors, self.embeddings)
+            self.vector_store.save(FAISS_INDEX_DIR)
+        else:
+            print("Indexing documents into LanceDB...")
+            # Write pre-computed vectors directly (same row layout as
+            # LanceDB.add_texts) so the wrapper doesn't embed them again
+            rows = [
+                {
+                    "vector": vector,
+                    "id": str(uuid.uuid4()),
+                    "text": text,
+                    "metadata": doc.metadata,
+                }
+                for doc, text, vector in zip(documents, texts, vectors)
+            ]
+            table = self._db.create_table(TABLE_NAME, data=rows, mode="overwrite")
+            # Small tables are fastest with a flat scan; large ones get IVF_PQ
+            if len(rows) > LANCEDB_ANN_MIN_ROWS:
+                table.create_index(
+                    metric="l2",
+                    num_partitions=max(1, int(math.sqrt(len(rows)))),
+                    num_sub_vectors=96
+                )
+            self.vector_store = LanceDB(
+                connection=self._db,
+                embedding=self.embeddings,
+                table_name=TABLE_NAME
+            )
+        self._write_index_meta({
+            "source": source,
+            "content_hash": content_hash,
+            "chunk_count": len(documents),
+            "backend": VECTOR_BACKEND,
+            "chunk_size": CHUNK_SIZE,
+            "chunk_overlap": CHUNK_OVERLAP,
+            "loader_version": LOADER_VERSION,
+        })
         print("Indexing complete.")
 
-    # --------------------------------------------------------------------------
-    # Phase C: Retrieval Chain Construction
-    # --------------------------------------------------------------------------
-    def get_rag_chain(self):
-        """Creates the retrieval chain."""
-        if not self.vector_store:
-            # Try to load existing table if possible
-            try:
+    def is_indexed(self, content_hash: str) -> bool:
+        """
+        True if the active store was built from content with this hash,
+        using the current backend, chunking parameters and loader version.
+        """
+        meta = self.index_meta
+        return (
+            self.vector_store is not None
+            and meta.get("backend") == VECTOR_BACKEND
+            and meta.get("content_hash") == content_hash
+            and meta.get("chunk_size") == CHUNK_SIZE
+            and meta.get("chunk_overlap") == CHUNK_OVERLAP
+            and meta.get("loader_version") == LOADER_VERSION
+        )
+
+    def _read_index_meta(self) -> dict:
+        try:
+            with open(INDEX_META_PATH, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_index_meta(self, meta: dict):
+        os.makedirs(os.path.dirname(INDEX_META_PATH), exist_ok=True)
+        with open(INDEX_META_PATH, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        self.index_meta = meta
+
+    def _load_existing_store(self):
+        """Loads a previously persisted, non-empty index/table if present."""
+        try:
+            if VECTOR_BACKEND == "faiss":
+                self.vector_store = FAISSStore.load(FAISS_INDEX_DIR, self.embeddings)
+            elif self._db.open_table(TABLE_NAME).count_rows() > 0:
                 self.vector_store = LanceDB(
                     connection=self._db,
                     embedding=self.embeddings,
-                    table_name=Config.TABLE_NAME
+                    table_name=TABLE_NAME
                 )
-            except Exception:
-                pass
-            
-            if not self.vector_store: 
-                raise ValueError("Vector store not initialized. Load documents first.")
+        except Exception:
+            pass
 
-        retriever = self.vector_store.as_retriever(
-            search_kwargs={"k": Config.SEARCH_K}
-        )
+    def _ensure_vector_store(self):
+        """Loads a previously persisted store if none is active yet."""
+        if not self.vector_store:
+            # Try to load existing index/table if possible
+            self._load_existing_store()
 
-        prompt = ChatPromptTemplate.from_template("""Answer the following question based only on the provided context:
+        if not self.vector_store:
+            raise ValueError("Vector store not initialized. Load documents first.")
 
-<context>
-{context}
-</context>
+    # --------------------------------------------------------------------------
+    # Phase C: Retrieval Chain Construction
+    # --------------------------------------------------------------------------
+    def get_rag_chain(self):
+        """Creates the retrieval chain."""
+        self._ensure_vector_store()
 
-Question: {input}
-""")
+        retriever = self.vector_store.as_retriever(
+            search_kwargs={"k": SEARCH_K}
+        )
 
-        document_chain = create_stuff_documents_chain(self.llm, prompt)
-        retrieval_chain = create_retrieval_chain(retriever, document_chain)
+        retrieval_chain = create_retrieval_chain(retriever, self._document_chain)
         return retrieval_chain
 
     # --------------------------------------------------------------------------
     # Phase D: Query Execution
     # --------------------------------------------------------------------------
+    def _retrieve(self, question: str) -> Tuple[List[Document], List[float], int]:
+        """Returns the top-K documents, their L2 scores and the K used."""
+        self._ensure_vector_store()
+
+        # Scores are raw L2 distances on both backends. Lower is better.
+        k_value = SEARCH_K
+        query_vector = self._embed_query(question)
+        if isinstance(self.vector_store, FAISSStore):
+            docs_and_scores = self.vector_store.similarity_search_with_score_by_vector(
+                query_vector,
+                k=k_value
+            )
+        else:
+            # score=True returns LanceDB's raw `_distance`; the
+            # *_with_relevance_scores variant rescales it to 1 - d/sqrt(2)
+            docs_and_scores = self.vector_store.similarity_search_by_vector(
+                query_vector,
+                k=k_value,
+                score=True
+            )
+
+        # Unpack results
+        docs = [doc for doc, score in docs_and_scores]
+        scores = [score for doc, score in docs_and_scores]
+        return docs, scores, k_value
+
+    def _build_messages(self, question: str, docs: List[Document]) -> List[BaseMessage]:
+        """
+        Fills the prompt with retrieved docs in rank order, stopping at
+        CONTEXT_TOKEN_BUDGET tokens (the last doc may be truncated).
+        """
+        budget = CONTEXT_TOKEN_BUDGET
+        contents = []
+        for doc in docs:
+            tokens = self._encoding.encode(doc.page_content)
+            if len(tokens) > budget:
+                if budget > 0:
+                    contents.append(self._encoding.decode(tokens[:budget]))
+                break
+            contents.append(doc.page_content)
+            budget -= len(tokens)
+
+        return self._prompt.format_messages(
+            input=question,
+            context="\n\n".join(contents)
+        )
+
     def query(self, question: str) -> dict:
         """
         Queries the RAG system.
@@ -135,53 +566,59 @@ Question: {input}
         - key 'scores': List of L2 distance scores for retrieved docs.
         - key 'top_k': The K value used for retrieval.
         """
-        if not self.vector_store:
-            # Try to load existing table if possible
-            try:
-                self.vector_store = LanceDB(
-                    connection=self._db,
-                    embedding=self.embeddings,
-                    table_name=Config.TABLE_NAME
-                )
-            except Exception:
-                pass
-            
-            if not self.vector_store: 
-                raise ValueError("Vector store not initialized. Load documents first.")
-
         # 1. Retrieve with Scores (L2 Distance)
-        # LanceDB default is L2. Lower is better.
-        k_value = Config.SEARCH_K
-        docs_and_scores = self.vector_store.similarity_search_with_score(
-            question, 
-            k=k_value
-        )
-        
-        # Unpack results
-        docs = [doc for doc, score in docs_and_scores]
-        scores = [score for doc, score in docs_and_scores]
+        docs, scores, k_value = self._retrieve(question)
 
-        # 2. Prepare Generation
-        prompt = ChatPromptTemplate.from_template("""Answer the following question based only on the provided context:
+        # 2. Generate Answer
+        message = self.llm.invoke(self._build_messages(question, docs))
+        response = message.content
 
-<context>
-{context}
-</context>
+        # 3. Return enriched response
+        return {
+            "answer": response,
+            "context": docs,
+            "scores": scores,
+            "top_k": k_value
+        }
 
-Question: {input}
-""")
-        document_chain = create_stuff_documents_chain(self.llm, prompt)
+    async def abatch_query(self, questions: List[str]) -> List[dict]:
+        """Runs independent questions concurrently, results in input order."""
+        return await asyncio.gather(*(self.aquery(q) for q in questions))
 
-        # 3. Generate Answer
-        response = document_chain.invoke({
-            "input": question,
-            "context": docs
-        })
+    async def aquery(self, question: str) -> dict:
+        """
+        Async version of query(), driven from the caller's event loop.
+        Returns the same keys as query().
+        """
+        # 1. Retrieve with Scores (L2 Distance)
+        # Vector search is blocking; run it off the event loop so concurrent
+        # queries overlap their retrieval with other queries' generation
+        docs, scores, k_value = await asyncio.to_thread(self._retrieve, question)
 
-        # 4. Return enriched response
+        # 2. Generate Answer
+        message = await self.llm.ainvoke(self._build_messages(question, docs))
+        response = message.content
+
+        # 3. Return enriched response
         return {
             "answer": response,
             "context": docs,
             "scores": scores,
             "top_k": k_value
         }
+
+    def stream_query(self, question: str) -> dict:
+        """
+        Same as query(), but 'answer' is an iterator of answer tokens.
+        Retrieval runs immediately; generation starts once the iterator is
+        consumed, so the first tokens can be shown while the rest arrive.
+        """
+        docs, scores, k_value = self._retrieve(question)
+        messages = self._build_messages(question, docs)
+        answer_stream = (chunk.content for chunk in self.llm.stream(messages))
+        return {
+            "answer": answer_stream,
+            "context": docs,
+            "scores": scores,
+            "top_k": k_value
+        }